@@ -0,0 +1,340 @@
+"""
+Asyncio spreadsheet service.
+
+Clients speak line-delimited JSON over a local socket. Every request line
+carries an optional "id" that is echoed back on its response line:
+
+    {"id": 1, "op": "edit", "edits": {"A1": "2", "B1": "A1 * 3"}}
+    {"id": 1, "ok": true, "values": {"A1": 2, "B1": 6}}
+
+    {"id": 2, "op": "read", "cells": ["A1", "B1"]}
+    {"id": 2, "ok": true, "values": {"A1": 2, "B1": 6}}
+
+    {"id": 3, "op": "explain", "edits": {"A1": "5"}}
+    {"id": 3, "ok": true, "plan": {"dirty_count": 2, "depth": 2, ...}}
+
+    {"id": 4, "op": "edit", "edits": {"A1": "A1 + 1"}}
+    {"id": 4, "ok": false, "error": "...", "errors": {"A1": "..."}}
+
+Edits that arrive within the coalescing window are merged into one batched
+graph update and recalc. Each request is validated on its own, so a bad edit
+only fails the request that sent it. Reads are answered from the last published values
+and never wait on a recalc that is in flight.
+
+Usage:
+    python main.py serve --port 8765 --data-dir ./data
+    python main.py bench --clients 16 --requests 500
+    python main.py bench-cache --rows 100 --requests 20
+"""
+import argparse
+import asyncio
+import json
+import random
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any
+
+from spreadsheet.engine import CellError, InvalidEditError, Sheet, get_cell_ref
+from spreadsheet.parser.call_cache import CallCache
+from spreadsheet.storage.durable_sheet import DurableSheet
+
+
+def to_json_value(value: Any) -> Any:
+    return str(value) if isinstance(value, CellError) else value
+
+
+def check_edits_shape(edits: Any) -> dict[str, str]:
+    # malformed requests are turned away before they can join a batch
+    if not isinstance(edits, dict) or not all(
+        isinstance(ref, str) and isinstance(formula, str)
+        for ref, formula in edits.items()
+    ):
+        raise Exception('"edits" must be an object mapping cell refs to formulas.')
+    return edits
+
+
+class SpreadsheetService:
+    def __init__(
+        self, sheet: Sheet | DurableSheet, coalesce_window: float = 0.002
+    ) -> None:
+        self.sheet = sheet
+        self.coalesce_window = coalesce_window
+        self.values: dict[str, Any] = {}
+
+        self._pending: list[tuple[dict[str, str], asyncio.Future]] = []
+        self._flush_task: asyncio.Task | None = None
+        # a single worker serialises every mutation of the sheet, so a
+        # DurableSheet behind the service fsyncs once per coalesced batch
+        # rather than sharing fsyncs between concurrent writers
+        self._executor = ThreadPoolExecutor(max_workers=1)
+
+    async def edit(self, edits: dict[str, str]) -> dict[str, Any]:
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        self._pending.append((edits, waiter))
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush())
+
+        return await waiter
+
+    def read(self, cell_refs: list[str]) -> dict[str, Any]:
+        return {ref: self.values.get(ref.upper()) for ref in cell_refs}
+
+    async def _flush(self) -> None:
+        await asyncio.sleep(self.coalesce_window)
+
+        pending, self._pending = self._pending, []
+        self._flush_task = None
+
+        loop = asyncio.get_running_loop()
+        batches = [edits for edits, _ in pending]
+        try:
+            updated, errors = await loop.run_in_executor(
+                self._executor, self._apply, batches
+            )
+        except Exception as e:
+            for _, waiter in pending:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        self.values.update(updated)
+        for (_, waiter), batch_errors in zip(pending, errors):
+            if waiter.done():
+                continue
+            if batch_errors:
+                waiter.set_exception(InvalidEditError(batch_errors))
+            else:
+                waiter.set_result(updated)
+
+    def _apply(
+        self, batches: list[dict[str, str]]
+    ) -> tuple[dict[str, Any], list[dict[str, str]]]:
+        # requests are checked one by one against the edits accepted so far,
+        # then everything that passed is committed as a single batch
+        merged: dict[str, str] = {}
+        errors = []
+        for edits in batches:
+            batch_errors = self.sheet.check_edits(edits, accepted=merged)
+            errors.append(batch_errors)
+            if not batch_errors:
+                for cell_ref, formula in edits.items():
+                    # the latest write to a cell has to be applied last
+                    merged.pop(cell_ref.upper(), None)
+                    merged[cell_ref.upper()] = formula
+
+        try:
+            recalculated = self.sheet.update_cells(merged) if merged else []
+        except InvalidEditError:
+            # requests that passed on their own must not fail with the merged
+            # batch, so fall back to committing them one at a time
+            recalculated = []
+            for i, edits in enumerate(batches):
+                if errors[i]:
+                    continue
+                try:
+                    recalculated.extend(self.sheet.update_cells(edits))
+                except InvalidEditError as e:
+                    errors[i] = e.errors
+        updated = {
+            cell.cell_ref: to_json_value(cell.get_value()) for cell in recalculated
+        }
+        return updated, errors
+
+    async def handle_request(self, request: dict) -> dict:
+        op = request.get("op")
+        if op == "edit":
+            values = await self.edit(check_edits_shape(request.get("edits")))
+        elif op == "read":
+            values = self.read(request["cells"])
+        elif op == "explain":
+            # planning only reads the sheet, but it has to queue behind edits
+            loop = asyncio.get_running_loop()
+            edits = check_edits_shape(request.get("edits"))
+            plan = await loop.run_in_executor(self._executor, self.sheet.explain, edits)
+            return {"ok": True, "plan": plan.to_dict()}
+        else:
+            raise Exception(f"Unknown op: {op}")
+        return {"ok": True, "values": values}
+
+    async def handle_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        tasks = set()
+        try:
+            while line := await reader.readline():
+                # requests on one connection are handled concurrently so that
+                # pipelined edits can share a batch
+                task = asyncio.create_task(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks)
+        finally:
+            writer.close()
+
+    async def _respond(self, line: bytes, writer: asyncio.StreamWriter) -> None:
+        request_id = None
+        try:
+            request = json.loads(line)
+            request_id = request.get("id")
+            response = await self.handle_request(request)
+        except InvalidEditError as e:
+            response = {"ok": False, "error": str(e), "errors": e.errors}
+        except Exception as e:
+            response = {"ok": False, "error": str(e)}
+        response["id"] = request_id
+        writer.write(json.dumps(response).encode() + b"\n")
+        await writer.drain()
+
+    async def start(
+        self, host: str = "127.0.0.1", port: int = 0, unix_path: str | None = None
+    ) -> asyncio.AbstractServer:
+        if unix_path:
+            return await asyncio.start_unix_server(self.handle_client, path=unix_path)
+        return await asyncio.start_server(self.handle_client, host=host, port=port)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
+
+
+async def serve(args: argparse.Namespace) -> None:
+    if args.data_dir:
+        sheet = DurableSheet.open(args.data_dir, (args.cols, args.rows))
+        cells = sheet.sheet.formula_cells()
+    else:
+        sheet = Sheet((args.cols, args.rows))
+        cells = []
+
+    service = SpreadsheetService(sheet, coalesce_window=args.window / 1000)
+    service.values.update(
+        {cell.cell_ref: to_json_value(cell.get_value()) for cell in cells}
+    )
+    server = await service.start(host=args.host, port=args.port, unix_path=args.unix)
+    async with server:
+        await server.serve_forever()
+
+
+async def run_client(
+    host: str, port: int, requests: int, read_ratio: float, refs: list[str]
+) -> list[float]:
+    reader, writer = await asyncio.open_connection(host, port)
+    latencies = []
+    for i in range(requests):
+        if random.random() < read_ratio:
+            request = {"id": i, "op": "read", "cells": random.sample(refs, 4)}
+        else:
+            ref = random.choice(refs[1:])
+            edits = {ref: str(random.randint(1, 99))}
+            request = {"id": i, "op": "edit", "edits": edits}
+
+        start = time.perf_counter()
+        writer.write(json.dumps(request).encode() + b"\n")
+        await writer.drain()
+        await reader.readline()
+        latencies.append(time.perf_counter() - start)
+
+    writer.close()
+    await writer.wait_closed()
+    return latencies
+
+
+async def bench(args: argparse.Namespace) -> None:
+    """
+    Starts the service in-process on an ephemeral port and drives it with
+    concurrent clients, reporting throughput and latency percentiles.
+    """
+    sheet = Sheet((args.cols, args.rows))
+    refs = [get_cell_ref(row=r, column=0) for r in range(args.rows)]
+    # the first column chains through a running total so edits fan out
+    sheet.update_cells({refs[0]: "0"})
+    sheet.update_cells(
+        {refs[i]: f"{refs[i - 1]} + 1" for i in range(1, len(refs))}
+    )
+
+    service = SpreadsheetService(sheet, coalesce_window=args.window / 1000)
+    service.values.update({ref: sheet.get_cell(ref).get_value() for ref in refs})
+    server = await service.start()
+    port = server.sockets[0].getsockname()[1]
+
+    start = time.perf_counter()
+    results = await asyncio.gather(
+        *[
+            run_client("127.0.0.1", port, args.requests, args.read_ratio, refs)
+            for _ in range(args.clients)
+        ]
+    )
+    elapsed = time.perf_counter() - start
+
+    server.close()
+    await server.wait_closed()
+    service.close()
+
+    latencies = sorted(latency for result in results for latency in result)
+    total = len(latencies)
+    print(f"requests:   {total}")
+    print(f"throughput: {total / elapsed:.0f} req/s")
+    print(f"p50:        {latencies[total // 2] * 1000:.2f} ms")
+    print(f"p99:        {latencies[int(total * 0.99)] * 1000:.2f} ms")
+
+
+def bench_cache(args: argparse.Namespace) -> None:
+    """
+    Times edits that fan out to many cells aggregating the same range, with
+    the aggregate cache enabled and with a cache that never stores anything.
+    """
+    values = {get_cell_ref(row=r, column=0): str(r) for r in range(args.rows)}
+    last = get_cell_ref(row=args.rows - 1, column=0)
+    # every cell in the second column re-aggregates the first one
+    totals = {
+        get_cell_ref(row=r, column=1): f"SUM(A1:{last}) + C1"
+        for r in range(args.rows)
+    }
+
+    timings = {}
+    for label, call_cache in [("cached", CallCache()), ("uncached", CallCache(0))]:
+        sheet = Sheet((3, args.rows))
+        sheet.call_cache = call_cache
+        sheet.update_cells({**values, "C1": "0"})
+        sheet.update_cells(totals)
+
+        start = time.perf_counter()
+        for i in range(args.requests):
+            sheet.update_cells({"C1": str(i)})
+        timings[label] = time.perf_counter() - start
+
+    for label, elapsed in timings.items():
+        print(f"{label + ':':<10}  {elapsed / args.requests * 1000:.2f} ms/edit")
+    print(f"speedup:    {timings['uncached'] / timings['cached']:.1f}x")
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description="Spreadsheet engine service")
+    arg_parser.add_argument("command", choices=["serve", "bench", "bench-cache"])
+    arg_parser.add_argument("--host", default="127.0.0.1")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--unix", help="serve on a unix socket path instead")
+    arg_parser.add_argument(
+        "--data-dir", help="persist edits to a write-ahead log in this directory"
+    )
+    arg_parser.add_argument("--cols", type=int, default=26)
+    arg_parser.add_argument("--rows", type=int, default=100)
+    arg_parser.add_argument(
+        "--window", type=float, default=2.0, help="edit coalescing window in ms"
+    )
+    arg_parser.add_argument("--clients", type=int, default=16)
+    arg_parser.add_argument("--requests", type=int, default=500)
+    arg_parser.add_argument("--read-ratio", type=float, default=0.8)
+    args = arg_parser.parse_args()
+
+    if args.command == "serve":
+        asyncio.run(serve(args))
+    elif args.command == "bench-cache":
+        bench_cache(args)
+    else:
+        asyncio.run(bench(args))
+
+
+if __name__ == "__main__":
+    main()
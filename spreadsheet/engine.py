@@ -1,8 +1,87 @@
-from typing import Any
-from graph.dependency_graph import DAG
-from parser.parser import Scanner, Parser
+import logging
+import threading
+import time
+from concurrent.futures import Future
+from enum import Enum, auto
+from typing import Any, Callable
+from spreadsheet.graph.dependency_graph import DAG
+from spreadsheet.parser.call_cache import CallCache
+from spreadsheet.parser.cell_refs import expand_range, get_cell_ref, ref_to_index
+from spreadsheet.parser.parse_nodes import library, volatile_functions
+from spreadsheet.parser.parser import Scanner, Parser
+from spreadsheet.parser.tokens import TokenType
 import re
 
+logger = logging.getLogger(__name__)
+
+
+class CellError:
+    """
+    Value of a cell whose formula failed to evaluate, e.g. because it
+    compares against an empty cell. Dependents of the cell get the same
+    error instead of raising.
+    """
+
+    def __init__(self, message: str) -> None:
+        self.message = message
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, CellError) and other.message == self.message
+
+    def __hash__(self) -> int:
+        return hash(self.message)
+
+    def __str__(self) -> str:
+        return f"#ERROR: {self.message}"
+
+    def __repr__(self) -> str:
+        return f"CellError({self.message!r})"
+
+
+class InvalidEditError(Exception):
+    """
+    Raised when a commit contains edits that cannot be applied. `errors`
+    maps each rejected cell ref to the reason.
+    """
+
+    def __init__(self, errors: dict[str, str]) -> None:
+        super().__init__("; ".join(f"{ref}: {error}" for ref, error in errors.items()))
+        self.errors = errors
+
+
+class DependencyError(Exception):
+    """
+    Raised while evaluating a formula that reads a cell holding a CellError.
+    """
+
+    def __init__(self, error: CellError) -> None:
+        super().__init__(error.message)
+        self.error = error
+
+
+class DependencyTable:
+    """
+    Cell ref table for a formula that calculates each dependency the first
+    time it is read, so memoized range aggregates skip their ranges.
+    """
+
+    def __init__(self, worksheet: "Sheet") -> None:
+        self.worksheet = worksheet
+        # seconds spent calculating dependencies that were still dirty
+        self.calculation_time = 0.0
+        self._values: dict[str, Any] = {}
+
+    def __getitem__(self, ref: str) -> Any:
+        if ref not in self._values:
+            cell = self.worksheet.get_cell(ref)
+            start = time.perf_counter()
+            self._values[ref] = cell.calculate(worksheet=self.worksheet)
+            self.calculation_time += time.perf_counter() - start
+        value = self._values[ref]
+        if isinstance(value, CellError):
+            raise DependencyError(value)
+        return value
+
 
 class Cell:
     def __init__(self, column_index: int, row_index: int, value=None, formula=None):
@@ -10,49 +89,126 @@ class Cell:
         self.row_index = row_index
         self.cell_ref = get_cell_ref(row=row_index, column=column_index)
         self._value = value
+        # value from before the cell last went dirty, so a recalc can tell
+        # whether it really changed
+        self.previous_value = value
 
         self._is_dirty = False
 
         self.formula = formula
         self.dependencies = self.get_formula_deps()
+        self._parse_tree = None
+        # seconds the last evaluation of the current formula took
+        self.eval_time: float | None = None
 
     def get_formula_deps(self) -> list[str]:
-        return (
-            [col + row for col, row in self.extract_formula_deps()]
-            if self.formula
-            else []
-        )
+        if not self.formula:
+            return []
+
+        # every cell inside a range is a dependency, not just its corners
+        refs = [
+            ref
+            for start, end in self.extract_formula_ranges()
+            for ref in expand_range(f"{start}:{end}")
+        ]
+        refs.extend(col + row for col, row in self.extract_formula_deps())
+        return list(dict.fromkeys(refs))
 
     def get_value(self) -> Any:
-        if self._is_dirty or not self._value:
+        # cells that were never calculated show their formula, dirty ones
+        # keep showing their last value until they are recalculated
+        if self._value is None:
             return self.formula
 
         return self._value
 
+    def get_last_value(self) -> tuple[Any, bool]:
+        """
+        Returns the last calculated value and whether it is stale.
+        """
+        return self._value, self._is_dirty
+
     def update_formula(self, new_formula: str) -> list[str]:
         self.formula = new_formula
-        self._is_dirty = True
+        self.mark_dirty()
         self.dependencies = self.get_formula_deps()
+        self._parse_tree = None
+        self.eval_time = None
+        return self.dependencies
+
+    def load(self, formula: str, value: Any) -> list[str]:
+        """
+        Restores a formula together with its previously calculated value.
+        The cell only counts as dirty if no value was recorded.
+        """
+        self.update_formula(formula)
+        self._value = value
+        self.previous_value = value
+        self._is_dirty = value is None
         return self.dependencies
 
+    def mark_dirty(self) -> None:
+        if not self._is_dirty:
+            self.previous_value = self._value
+        self._is_dirty = True
+
     def calculate(self, worksheet: "Sheet"):
         if self._value is not None and not self._is_dirty:
             return self._value
         if self.formula is not None:
-            self._value = self.eval_formula(worksheet=worksheet)
+            dependency_table = DependencyTable(worksheet)
+            start = time.perf_counter()
+            try:
+                self._value = self.eval_formula(worksheet, dependency_table)
+            except Exception as e:
+                self._value = CellError(str(e))
+            # upstream cells calculated on first read aren't this cell's cost
+            elapsed = time.perf_counter() - start
+            self.eval_time = elapsed - dependency_table.calculation_time
+            self._is_dirty = False
             return self._value
         return None
 
-    def eval_formula(self, worksheet: "Sheet") -> Any:
-        scanner = Scanner(self.formula)
-        tokens = scanner.scan_tokens()
-        scanner.print_tokens()
-        parse_tree = Parser(tokens).parse()
-        dependency_table = {
-            ref: worksheet.get_cell(ref).calculate(worksheet=worksheet)
-            for ref in self.dependencies
-        }
-        return parse_tree.eval(cell_ref_table=dependency_table)
+    def set_error(self, message: str) -> CellError:
+        self._value = CellError(message)
+        self._is_dirty = False
+        return self._value
+
+    def get_parse_tree(self):
+        # formulas only change through update_formula, so the tree can be reused
+        if self._parse_tree is None:
+            tokens = Scanner(self.formula).scan_tokens()
+            self._parse_tree = Parser(tokens).parse()
+        return self._parse_tree
+
+    def eval_formula(
+        self, worksheet: "Sheet", dependency_table: DependencyTable | None = None
+    ) -> Any:
+        if dependency_table is None:
+            dependency_table = DependencyTable(worksheet)
+        try:
+            return self.get_parse_tree().eval(
+                cell_ref_table=dependency_table,
+                call_cache=worksheet.call_cache,
+            )
+        except DependencyError as e:
+            return e.error
+
+    def is_volatile(self) -> bool:
+        """
+        Whether the formula calls a volatile function such as RAND or NOW.
+        """
+        if not self.formula:
+            return False
+        # cheap substring check first, edits rarely involve volatile functions
+        lowered = self.formula.lower()
+        if not any(name in lowered for name in volatile_functions):
+            return False
+        return any(
+            token.type == TokenType.IDENTIFIER
+            and token.text.lower() in volatile_functions
+            for token in Scanner(self.formula).scan_tokens()
+        )
 
     def get_top_sorted_deps(self) -> list[str]:
         pass
@@ -62,6 +218,10 @@ class Cell:
         result = regex.findall(self.formula)
         return result
 
+    def extract_formula_ranges(self) -> list[tuple[str, str]]:
+        regex = re.compile(r"([A-Za-z]+\d+):([A-Za-z]+\d+)")
+        return regex.findall(self.formula)
+
     def has_dependencies(self) -> bool:
         return len(self.dependencies) > 0
 
@@ -124,62 +284,445 @@ def build_column(col_index: int, row_count: int):
     return col
 
 
+class RecalcPlan:
+    """
+    Dry-run description of the recalc an edit would trigger, as returned by
+    Sheet.explain.
+    """
+
+    def __init__(
+        self,
+        dirty_cells: list[str],
+        levels: list[list[str]],
+        invalidated_ranges: dict[str, list[str]],
+        invalidated_functions: dict[str, int],
+        estimated_cost: float,
+        unmeasured_cells: int,
+        creates_cycle: bool,
+    ) -> None:
+        self.dirty_cells = dirty_cells
+        self.levels = levels
+        # formula cell -> ranges it reads that contain a dirtied cell
+        self.invalidated_ranges = invalidated_ranges
+        # aggregate function name -> number of its calls in dirtied cells
+        self.invalidated_functions = invalidated_functions
+        # estimated seconds, with unmeasured cells costed at the mean
+        self.estimated_cost = estimated_cost
+        self.unmeasured_cells = unmeasured_cells
+        self.creates_cycle = creates_cycle
+
+    @property
+    def depth(self) -> int:
+        return len(self.levels)
+
+    @property
+    def width(self) -> int:
+        return max((len(level) for level in self.levels), default=0)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "dirty_count": len(self.dirty_cells),
+            "depth": self.depth,
+            "width": self.width,
+            "invalidated_ranges": self.invalidated_ranges,
+            "invalidated_functions": self.invalidated_functions,
+            "estimated_cost": self.estimated_cost,
+            "unmeasured_cells": self.unmeasured_cells,
+            "creates_cycle": self.creates_cycle,
+        }
+
+    def __str__(self) -> str:
+        return (
+            f"RecalcPlan(dirty={len(self.dirty_cells)}, depth={self.depth}, "
+            f"width={self.width}, estimated_cost={self.estimated_cost:.6f}s)"
+        )
+
+
+class CalculationMode(Enum):
+    # recalculate the affected cells as part of every edit
+    AUTOMATIC = auto()
+    # leave cells dirty until Sheet.recalculate() is called
+    MANUAL = auto()
+    # a worker thread drains dirty cells while edits return immediately
+    BACKGROUND = auto()
+
+
 class Sheet:
-    def __init__(self, dimensions: tuple[int, int]):
+    def __init__(
+        self,
+        dimensions: tuple[int, int],
+        calculation_mode: CalculationMode = CalculationMode.AUTOMATIC,
+    ):
         col_count, row_count = dimensions
+        self.dimensions = dimensions
         self.rows = [build_row(i, col_count=col_count) for i in range(row_count)]
         self.cols = [build_column(i, row_count=row_count) for i in range(col_count)]
         self.dependency_graph = DAG()
+        self.dirty_cells: set[Cell] = set()
+        # cells calling volatile functions are recalculated on every recalc
+        self.volatile_cells: set[Cell] = set()
+        self.call_cache = CallCache()
+
+        self.calculation_mode = CalculationMode.MANUAL
+        self._lock = threading.RLock()
+        self._dirty_added = threading.Condition(self._lock)
+        self._futures: dict[Cell, list[Future]] = {}
+        self._subscriptions: dict[int, Callable[[dict[str, Any]], None]] = {}
+        self._subscribers: dict[Cell, set[int]] = {}
+        self._next_subscription_id = 1
+        self._worker: threading.Thread | None = None
+        self.set_calculation_mode(calculation_mode)
 
     def get_cell(self, cell_ref: str):
         col_i, row_i = ref_to_index(cell_ref)
         return self.rows[row_i].get_cell(col_i)
 
-    # TODO: Check for cycles
+    def set_calculation_mode(self, mode: CalculationMode) -> None:
+        with self._lock:
+            self.calculation_mode = mode
+            self._dirty_added.notify_all()
+
+        if mode == CalculationMode.BACKGROUND:
+            if self._worker is None:
+                self._worker = threading.Thread(
+                    target=self._drain_dirty_cells, daemon=True
+                )
+                self._worker.start()
+        elif self._worker is not None:
+            self._worker.join()
+            self._worker = None
+
+        if mode == CalculationMode.AUTOMATIC:
+            self.recalculate()
+
     def update_cell_formula(self, cell_ref: str, formula: str) -> None:
-        column_index, row_index = ref_to_index(cell_ref)
-        cell: Cell = self.rows[row_index].get_cell(column_index)
+        self.update_cells({cell_ref: formula})
+
+    def load_cell(self, cell_ref: str, formula: str, value: Any) -> None:
+        """
+        Restores a cell from a checkpoint without dirtying its dependents.
+        """
+        with self._lock:
+            cell = self.get_cell(cell_ref)
+            self.call_cache.invalidate(cell.cell_ref)
+            dependency_refs = cell.load(formula, value)
+            predecessors = [self.get_cell(cell_ref) for cell_ref in dependency_refs]
+            self.dependency_graph.add(cell, *predecessors)
+            self._track_volatility(cell)
+            if value is None:
+                self.dirty_cells.add(cell)
+
+    def formula_cells(self) -> list[Cell]:
+        return [cell for row in self.rows for cell in row.cells if cell.formula]
+
+    def update_cells(self, edits: dict[str, str]) -> list[Cell]:
+        """
+        Applies a batch of formula edits as one commit. In automatic mode
+        everything they dirtied is recalculated in a single pass and returned
+        in topological order; the other modes return immediately.
+
+        The whole batch is rejected with InvalidEditError, before anything is
+        changed, if any edit fails check_edits.
+        """
+        order, changes = [], {}
+        try:
+            with self._lock:
+                errors = self.check_edits(edits)
+                if errors:
+                    raise InvalidEditError(errors)
+
+                for cell_ref, formula in edits.items():
+                    self._set_formula(cell_ref, formula)
+
+                if self.calculation_mode == CalculationMode.AUTOMATIC:
+                    order = self._recalculate_dirty_cells(changes)
+                elif self.calculation_mode == CalculationMode.BACKGROUND:
+                    self._dirty_added.notify_all()
+        finally:
+            # cells calculated before a failure still changed
+            self._notify_subscribers(changes)
+        return order
+
+    def check_edits(
+        self, edits: dict[str, str], accepted: dict[str, str] | None = None
+    ) -> dict[str, str]:
+        """
+        Validates edits without applying them and returns an error message
+        for every rejected cell ref: formulas that don't parse, references
+        outside the sheet and circular references. `accepted` holds edits
+        already validated for the same commit.
+        """
+        with self._lock:
+            overrides: dict[Cell, set[Cell]] = {}
+            extra_dependents: dict[Cell, set[Cell]] = {}
+
+            def stage(cell: Cell, predecessors: set[Cell]) -> None:
+                overrides[cell] = predecessors
+                for dep in predecessors:
+                    extra_dependents.setdefault(dep, set()).add(cell)
+
+            for cell_ref, formula in (accepted or {}).items():
+                stage(*self._prospective_dependencies(cell_ref, formula))
+
+            errors = {}
+            # every edit is staged before any is checked, so cycles are judged
+            # against the graph the whole commit produces, whatever the order
+            checked = []
+            for cell_ref, formula in edits.items():
+                try:
+                    cell, predecessors = self._prospective_dependencies(
+                        cell_ref, formula
+                    )
+                    Parser(Scanner(formula).scan_tokens()).parse()
+                except Exception as e:
+                    errors[cell_ref] = str(e)
+                    continue
+                stage(cell, predecessors)
+                checked.append((cell_ref, cell))
+
+            for cell_ref, cell in checked:
+                if self.dependency_graph.creates_cycle(
+                    cell, overrides[cell], overrides, extra_dependents
+                ):
+                    errors[cell_ref] = f"{cell.cell_ref} would create a cycle."
+            return errors
+
+    def recalculate(self) -> list[Cell]:
+        changes = {}
+        try:
+            with self._lock:
+                order = self._recalculate_dirty_cells(changes)
+        finally:
+            self._notify_subscribers(changes)
+        return order
+
+    def subscribe(
+        self, refs: list[str], callback: Callable[[dict[str, Any]], None]
+    ) -> int:
+        """
+        Registers a callback for cells or ranges such as "A1" or "A1:B5".
+        After each recalc the callback gets one dict of {cell_ref: value}
+        holding only the watched cells whose value actually changed.
+        Exceptions raised by a callback are logged and don't affect other
+        subscribers. Returns an id to pass to unsubscribe.
+        """
+        with self._lock:
+            subscription_id = self._next_subscription_id
+            self._next_subscription_id += 1
+            self._subscriptions[subscription_id] = callback
+            for ref in refs:
+                for cell_ref in expand_range(ref):
+                    cell = self.get_cell(cell_ref)
+                    self._subscribers.setdefault(cell, set()).add(subscription_id)
+            return subscription_id
+
+    def unsubscribe(self, subscription_id: int) -> None:
+        with self._lock:
+            self._subscriptions.pop(subscription_id, None)
+            for subscription_ids in self._subscribers.values():
+                subscription_ids.discard(subscription_id)
+
+    def get_future(self, cell_ref: str) -> Future:
+        """
+        Returns a future that resolves with the cell's value once it is no
+        longer dirty. Use Cell.get_last_value to read without waiting.
+        """
+        with self._lock:
+            cell = self.get_cell(cell_ref)
+            future = Future()
+            value, is_stale = cell.get_last_value()
+            if is_stale:
+                self._futures.setdefault(cell, []).append(future)
+            else:
+                future.set_result(value)
+            return future
+
+    def explain(self, edits: dict[str, str]) -> RecalcPlan:
+        """
+        Plans the recalc that update_cells(edits) would trigger without
+        applying anything: which cells would be dirtied, how deep and wide
+        the recalc is, what it invalidates and roughly how long it takes.
+        """
+        with self._lock:
+            edited = {self.get_cell(ref): formula for ref, formula in edits.items()}
+            # volatile cells are recalculated by every recalc, edit or not
+            dirtied = self.dependency_graph.descendants(
+                *edited, *self.volatile_cells
+            )
+
+            overrides = dict(
+                self._prospective_dependencies(ref, formula)
+                for ref, formula in edits.items()
+            )
+
+            try:
+                levels = self.dependency_graph.topological_levels(dirtied, overrides)
+                creates_cycle = False
+            except Exception:
+                levels, creates_cycle = [], True
+
+            dirtied_refs = {cell.cell_ref for cell in dirtied}
+            invalidated_ranges: dict[str, list[str]] = {}
+            invalidated_functions: dict[str, int] = {}
+            measured = []
+            for cell in dirtied:
+                formula = edited.get(cell, cell.formula)
+                for token in Scanner(formula).scan_tokens():
+                    if token.type == TokenType.CELL_RANGE:
+                        range_refs = expand_range(token.text)
+                        if not dirtied_refs.isdisjoint(range_refs):
+                            ranges = invalidated_ranges.setdefault(cell.cell_ref, [])
+                            ranges.append(token.text)
+                    elif token.type == TokenType.IDENTIFIER:
+                        name = token.text.lower()
+                        # only aggregates have cached results to invalidate
+                        if name not in library or not library[name].aggregate:
+                            continue
+                        count = invalidated_functions.get(name, 0)
+                        invalidated_functions[name] = count + 1
+                if cell not in edited and cell.eval_time is not None:
+                    measured.append(cell.eval_time)
+
+            unmeasured = len(dirtied) - len(measured)
+            mean = sum(measured) / len(measured) if measured else 0.0
+            return RecalcPlan(
+                dirty_cells=sorted(dirtied_refs),
+                levels=[sorted(cell.cell_ref for cell in level) for level in levels],
+                invalidated_ranges=invalidated_ranges,
+                invalidated_functions=invalidated_functions,
+                estimated_cost=sum(measured) + unmeasured * mean,
+                unmeasured_cells=unmeasured,
+                creates_cycle=creates_cycle,
+            )
+
+    def _checked_cell(self, cell_ref: str) -> Cell:
+        try:
+            col_i, row_i = ref_to_index(cell_ref)
+        except Exception:
+            raise Exception(f"Invalid cell reference: {cell_ref}")
+        col_count, row_count = self.dimensions
+        if not (0 <= col_i < col_count and 0 <= row_i < row_count):
+            raise Exception(f"{cell_ref} is outside the sheet.")
+        return self.rows[row_i].get_cell(col_i)
+
+    def _prospective_dependencies(
+        self, cell_ref: str, formula: str
+    ) -> tuple[Cell, set[Cell]]:
+        cell = self._checked_cell(cell_ref)
+        prospective = Cell(cell.column_index, cell.row_index, formula=formula)
+        return cell, {self._checked_cell(ref) for ref in prospective.dependencies}
+
+    def _set_formula(self, cell_ref: str, formula: str) -> None:
+        cell = self.get_cell(cell_ref)
         dependency_refs = cell.update_formula(formula)
         predecessors = [self.get_cell(cell_ref) for cell_ref in dependency_refs]
         self.dependency_graph.add(cell, *predecessors)
+        self._track_volatility(cell)
+
+        for dependent in self.dependency_graph.descendants(cell):
+            self._mark_dirty(dependent)
+
+    def _track_volatility(self, cell: Cell) -> None:
+        if cell.is_volatile():
+            self.volatile_cells.add(cell)
+        else:
+            self.volatile_cells.discard(cell)
+
+    def _mark_volatile_dirty(self) -> None:
+        for dependent in self.dependency_graph.descendants(*self.volatile_cells):
+            self._mark_dirty(dependent)
+
+    def _mark_dirty(self, cell: Cell) -> None:
+        cell.mark_dirty()
+        self.dirty_cells.add(cell)
+        self.call_cache.invalidate(cell.cell_ref)
+
+    def _recalculate_dirty_cells(self, changes: dict[Cell, Any]) -> list[Cell]:
+        self._mark_volatile_dirty()
+        order = self._sort_dirty_cells(changes)
+        for cell in order:
+            self._calculate_dirty_cell(cell, changes)
+        return order
+
+    def _sort_dirty_cells(self, changes: dict[Cell, Any]) -> list[Cell]:
+        try:
+            return self.dependency_graph.topological_sort(self.dirty_cells)
+        except Exception as e:
+            # only a sheet restored with a cycle gets here, edits are checked.
+            # every dirty cell gets the error so nothing stays dirty forever
+            for cell in list(self.dirty_cells):
+                cell.set_error(str(e))
+                self._resolve_cell(cell, changes)
+            return []
+
+    def _calculate_dirty_cell(self, cell: Cell, changes: dict[Cell, Any]) -> None:
+        # cells pulled in by a dependent's calculation are already clean
+        if cell not in self.dirty_cells:
+            return
+        try:
+            cell.calculate(worksheet=self)
+        except Exception as e:
+            # calculate stores evaluation errors itself, this covers the rest
+            cell.set_error(str(e))
+        self._resolve_cell(cell, changes)
+
+    def _resolve_cell(self, cell: Cell, changes: dict[Cell, Any]) -> None:
+        value, _ = cell.get_last_value()
+        self.dirty_cells.discard(cell)
+        for future in self._futures.pop(cell, []):
+            future.set_result(value)
+        previous = cell.previous_value
+        if value != previous or type(value) is not type(previous):
+            changes[cell] = value
+
+    def _notify_subscribers(self, changes: dict[Cell, Any]) -> None:
+        # called without the lock so callbacks are free to read the sheet
+        batches: dict[int, dict[str, Any]] = {}
+        with self._lock:
+            for cell, value in changes.items():
+                for subscription_id in self._subscribers.get(cell, set()):
+                    batches.setdefault(subscription_id, {})[cell.cell_ref] = value
+            callbacks = [
+                (subscription_id, self._subscriptions[subscription_id], batch)
+                for subscription_id, batch in batches.items()
+            ]
+
+        for subscription_id, callback, batch in callbacks:
+            try:
+                callback(batch)
+            except Exception:
+                logger.exception("Subscriber %s failed", subscription_id)
+
+    def _drain_dirty_cells(self) -> None:
+        while True:
+            with self._lock:
+                while (
+                    self.calculation_mode == CalculationMode.BACKGROUND
+                    and not self.dirty_cells
+                ):
+                    self._dirty_added.wait()
+                if self.calculation_mode != CalculationMode.BACKGROUND:
+                    return
+                # only piggyback on passes that edits triggered, otherwise
+                # volatile cells would keep the worker spinning
+                self._mark_volatile_dirty()
+                changes = {}
+                order = self._sort_dirty_cells(changes)
+
+            # the lock is only held per cell so edits never wait on a full pass
+            try:
+                for cell in order:
+                    with self._lock:
+                        if self.calculation_mode != CalculationMode.BACKGROUND:
+                            break
+                        self._calculate_dirty_cell(cell, changes)
+            finally:
+                self._notify_subscribers(changes)
 
     def get_string_matrix(self) -> list[list[str]]:
         return [str(r) for r in self.rows]
 
 
-def get_cell_ref(row, column):
-    column_letters = ""
-    while column >= 0:
-        column_letters = chr((column % 26) + ord("A")) + column_letters
-        column = column // 26 - 1
-    return column_letters + str(row + 1)
-
-
-def ref_to_index(ref: str):
-    """
-    Takes in a cell reference and returns zero-based column and row index tuple.
-
-    Example:
-        col_index, row_index = ref_to_index("A5")
-
-        col_index == 0
-        row_index == 4
-    """
-    regex = re.compile("([A-Za-z]+)(\d+)")
-    res = regex.match(ref)
-
-    col = res.group(1)
-    row = res.group(2)
-
-    index = 0
-    for i in range(len(col)):
-        char = ref[i].upper()
-        char_index = ord(char) - ord("A") + 1
-        addition = char_index * (26 ** (len(col) - i - 1))
-        index += addition
-    return index - 1, int(row) - 1
-
-
 if __name__ == "__main__":
     sheet = Sheet((10, 10))
 
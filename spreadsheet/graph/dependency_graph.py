@@ -1,14 +1,153 @@
 from collections import deque
+from typing import Iterable
 
 
 class DAG:
-    def __init__(self, graph: dict[str, set[str]] = {}) -> None:
-        self.graph = graph
+    def __init__(self, graph: dict[str, set[str]] | None = None) -> None:
+        self.graph = graph if graph is not None else {}
+        self.dependents: dict[str, set[str]] = {}
+        for node, predecessors in self.graph.items():
+            for dep in predecessors:
+                self.dependents.setdefault(dep, set()).add(node)
 
     def add(self, node: str, *predecessors: str) -> None:
-        # graph points backwards at dependencies
-        if node not in self.graph:
-            self.graph[node] = {*predecessors}
+        # graph points backwards at dependencies, dependents points forwards
+        for dep in self.graph.get(node, set()):
+            self.dependents[dep].discard(node)
+
+        self.graph[node] = {*predecessors}
+        for dep in predecessors:
+            self.dependents.setdefault(dep, set()).add(node)
+
+    def descendants(self, *nodes: str) -> set[str]:
+        """
+        Returns the given nodes plus every node that transitively depends on them.
+        """
+        queue = deque(nodes)
+        seen = set(nodes)
+
+        while len(queue):
+            next_node = queue.popleft()
+            for dependent in self.dependents.get(next_node, set()):
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+
+        return seen
+
+    def ancestors(self, *nodes: str) -> set[str]:
+        """
+        Returns the given nodes plus every node they transitively depend on.
+        """
+        queue = deque(nodes)
+        seen = set(nodes)
+
+        while len(queue):
+            next_node = queue.popleft()
+            for dep in self.graph.get(next_node, set()):
+                if dep not in seen:
+                    seen.add(dep)
+                    queue.append(dep)
+
+        return seen
+
+    def creates_cycle(
+        self,
+        node: str,
+        predecessors: set[str],
+        overrides: dict[str, set[str]] | None = None,
+        extra_dependents: dict[str, set[str]] | None = None,
+    ) -> bool:
+        """
+        Whether giving `node` these predecessors would close a cycle.
+        `overrides` holds pending dependency changes, possibly including
+        `node` itself, with `extra_dependents` as their forward edges.
+        """
+        if node in predecessors:
+            return True
+
+        overrides = overrides or {}
+        extra_dependents = extra_dependents or {}
+        queue = deque([node])
+        seen = {node}
+
+        while len(queue):
+            next_node = queue.popleft()
+            dependents = self.dependents.get(next_node, set())
+            dependents = dependents | extra_dependents.get(next_node, set())
+            for dependent in dependents:
+                # a pending edit may have dropped this edge
+                if dependent in overrides and next_node not in overrides[dependent]:
+                    continue
+                if dependent in predecessors:
+                    return True
+                if dependent not in seen:
+                    seen.add(dependent)
+                    queue.append(dependent)
+
+        return False
+
+    def topological_sort(self, nodes: Iterable[str]) -> list[str]:
+        """
+        Orders a subset of the graph so every node comes after the
+        dependencies it shares with that subset.
+        """
+        nodes = set(nodes)
+        in_degree = {
+            node: len(self.graph.get(node, set()) & nodes) for node in nodes
+        }
+        queue = deque(node for node, degree in in_degree.items() if degree == 0)
+        order = []
+
+        while len(queue):
+            next_node = queue.popleft()
+            order.append(next_node)
+            for dependent in self.dependents.get(next_node, set()):
+                if dependent in in_degree:
+                    in_degree[dependent] -= 1
+                    if in_degree[dependent] == 0:
+                        queue.append(dependent)
+
+        if len(order) != len(nodes):
+            raise Exception("Cycle detected in dependency graph.")
+
+        return order
+
+    def topological_levels(
+        self, nodes: Iterable[str], overrides: dict[str, set[str]] | None = None
+    ) -> list[list[str]]:
+        """
+        Groups a subset of the graph into levels where every node only depends
+        on nodes from earlier levels. `overrides` replaces the dependencies of
+        individual nodes, so a prospective edit can be planned without
+        touching the graph.
+        """
+        nodes = set(nodes)
+        overrides = overrides or {}
+        children = {node: [] for node in nodes}
+        in_degree = {}
+        for node in nodes:
+            predecessors = overrides.get(node, self.graph.get(node, set())) & nodes
+            in_degree[node] = len(predecessors)
+            for dep in predecessors:
+                children[dep].append(node)
+
+        level = [node for node, degree in in_degree.items() if degree == 0]
+        levels = []
+        while len(level):
+            levels.append(level)
+            next_level = []
+            for node in level:
+                for child in children[node]:
+                    in_degree[child] -= 1
+                    if in_degree[child] == 0:
+                        next_level.append(child)
+            level = next_level
+
+        if sum(len(level) for level in levels) != len(nodes):
+            raise Exception("Cycle detected in dependency graph.")
+
+        return levels
 
     # TODO: check for cycles
     def is_valid(self) -> bool:
@@ -0,0 +1,86 @@
+import sys
+from collections import OrderedDict
+from typing import Any, Hashable
+
+from .cell_refs import expand_range
+
+
+def estimate_size(value: Any) -> int:
+    if isinstance(value, tuple):
+        return sys.getsizeof(value) + sum(estimate_size(item) for item in value)
+    return sys.getsizeof(value)
+
+
+class CallCache:
+    """
+    LRU cache of range aggregate results such as SUM(A1:A100), keyed by the
+    function name and the range texts rather than the values in the ranges,
+    so a hit costs the same however large the range is. The sheet calls
+    invalidate() for every cell it dirties, which drops the entries whose
+    ranges contain it. Least recently used entries are evicted once the
+    estimated size of the cache goes over `max_bytes`.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024) -> None:
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        # cell ref -> keys of the entries whose ranges contain it
+        self._keys_by_ref: dict[str, set[Hashable]] = {}
+
+    def get(self, func: str, ranges: tuple[str, ...]) -> tuple[bool, Any]:
+        key = (func, ranges)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return True, self._entries[key][0]
+        self.misses += 1
+        return False, None
+
+    def put(self, func: str, ranges: tuple[str, ...], value: Any) -> None:
+        key = (func, ranges)
+        entry_size = estimate_size(key) + estimate_size(value)
+        if entry_size > self.max_bytes:
+            return
+        refs = [ref for range_text in ranges for ref in expand_range(range_text)]
+        # the index entries are counted too, they grow with the range
+        entry_size += sum(sys.getsizeof(ref) for ref in refs)
+        if entry_size > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (value, entry_size)
+        self.size += entry_size
+        for ref in refs:
+            self._keys_by_ref.setdefault(ref, set()).add(key)
+
+        while self.size > self.max_bytes:
+            self._evict(next(iter(self._entries)))
+
+    def invalidate(self, cell_ref: str) -> None:
+        for key in self._keys_by_ref.pop(cell_ref, set()):
+            self._evict(key)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._keys_by_ref.clear()
+        self.size = 0
+
+    def _evict(self, key: Hashable) -> None:
+        if key not in self._entries:
+            return
+        self.size -= self._entries.pop(key)[1]
+        _, ranges = key
+        for range_text in ranges:
+            for ref in expand_range(range_text):
+                keys = self._keys_by_ref.get(ref)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_ref[ref]
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,55 @@
+import re
+
+
+def get_cell_ref(row, column):
+    column_letters = ""
+    while column >= 0:
+        column_letters = chr((column % 26) + ord("A")) + column_letters
+        column = column // 26 - 1
+    return column_letters + str(row + 1)
+
+
+def expand_range(ref: str) -> list[str]:
+    """
+    Expands a range reference into its cell references, row by row. A plain
+    cell reference expands to itself.
+
+    Example:
+        expand_range("A1:B2") == ["A1", "B1", "A2", "B2"]
+    """
+    if ":" not in ref:
+        return [ref.upper()]
+
+    start, end = ref.split(":")
+    start_col, start_row = ref_to_index(start)
+    end_col, end_row = ref_to_index(end)
+    return [
+        get_cell_ref(row=row, column=col)
+        for row in range(min(start_row, end_row), max(start_row, end_row) + 1)
+        for col in range(min(start_col, end_col), max(start_col, end_col) + 1)
+    ]
+
+
+def ref_to_index(ref: str):
+    """
+    Takes in a cell reference and returns zero-based column and row index tuple.
+
+    Example:
+        col_index, row_index = ref_to_index("A5")
+
+        col_index == 0
+        row_index == 4
+    """
+    regex = re.compile("([A-Za-z]+)(\d+)")
+    res = regex.match(ref)
+
+    col = res.group(1)
+    row = res.group(2)
+
+    index = 0
+    for i in range(len(col)):
+        char = ref[i].upper()
+        char_index = ord(char) - ord("A") + 1
+        addition = char_index * (26 ** (len(col) - i - 1))
+        index += addition
+    return index - 1, int(row) - 1
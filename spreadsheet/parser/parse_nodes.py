@@ -1,6 +1,10 @@
 from abc import ABC, abstractmethod
 from .tokens import *
-from typing import Any
+from .call_cache import CallCache
+from .cell_refs import expand_range
+from typing import Any, Callable
+import random
+import time
 
 
 literals = {
@@ -15,7 +19,7 @@ literals = {
 
 class Expr(ABC):
     @abstractmethod
-    def eval(self, cell_ref_table: dict[str, Any]):
+    def eval(self, cell_ref_table: dict[str, Any], call_cache: CallCache | None = None):
         pass
 
 
@@ -25,9 +29,9 @@ class BinOp(Expr):
         self.left = left
         self.right = right
 
-    def eval(self, cell_ref_table: dict[str, Any]):
-        left = self.left.eval(cell_ref_table=cell_ref_table)
-        right = self.right.eval(cell_ref_table=cell_ref_table)
+    def eval(self, cell_ref_table: dict[str, Any], call_cache: CallCache | None = None):
+        left = self.left.eval(cell_ref_table=cell_ref_table, call_cache=call_cache)
+        right = self.right.eval(cell_ref_table=cell_ref_table, call_cache=call_cache)
 
         if self.op == TokenType.ADDITION:
             return left + right
@@ -61,11 +65,12 @@ class UnaryOp(Expr):
         self.operator = operator
         self.operand = operand
 
-    def eval(self, cell_ref_table: dict[str, Any]):
+    def eval(self, cell_ref_table: dict[str, Any], call_cache: CallCache | None = None):
+        value = self.operand.eval(cell_ref_table=cell_ref_table, call_cache=call_cache)
         if self.operator.type == TokenType.SUBTRACTION:
-            return -self.operand.eval(cell_ref_table=cell_ref_table)
+            return -value
         else:
-            return self.operand.eval(cell_ref_table=cell_ref_table)
+            return value
 
     def __repr__(self) -> str:
         return f"Unary({self.operator}, {self.operand})"
@@ -78,10 +83,10 @@ class Literal(Expr):
     def resolve_cell_ref(self) -> Any:
         pass
 
-    def resolve_cell_range(self) -> list[Any]:
-        pass
+    def resolve_cell_range(self, cell_ref_table: dict[str, Any]) -> list[Any]:
+        return [cell_ref_table[ref] for ref in expand_range(self.token.text)]
 
-    def eval(self, cell_ref_table: dict[str, Any]):
+    def eval(self, cell_ref_table: dict[str, Any], call_cache: CallCache | None = None):
         if self.token.type == TokenType.TRUE:
             return True
         elif self.token.type == TokenType.FALSE:
@@ -94,7 +99,7 @@ class Literal(Expr):
         elif self.token.type == TokenType.CELL_REF:
             return cell_ref_table[self.token.text]
         elif self.token.type == TokenType.CELL_RANGE:
-            return self.resolve_cell_range()
+            return self.resolve_cell_range(cell_ref_table)
         else:
             return None
 
@@ -135,7 +140,78 @@ def not_impl(*args: list[Expr]):
             return False
 
 
-library = {"and": and_impl, "if": if_impl, "not": not_impl}
+def flatten_numbers(args) -> list[Any]:
+    # ranges arrive as lists; empty cells inside them are skipped
+    values = []
+    for arg in args:
+        if isinstance(arg, list):
+            values.extend(value for value in arg if value is not None)
+        elif arg is not None:
+            values.append(arg)
+    return values
+
+
+def sum_impl(*args: list[Expr]):
+    return sum(flatten_numbers(args))
+
+
+def min_impl(*args: list[Expr]):
+    return min(flatten_numbers(args), default=0)
+
+
+def max_impl(*args: list[Expr]):
+    return max(flatten_numbers(args), default=0)
+
+
+def average_impl(*args: list[Expr]):
+    values = flatten_numbers(args)
+    if not values:
+        raise Exception("AVERAGE needs at least one value.")
+    return sum(values) / len(values)
+
+
+def count_impl(*args: list[Expr]):
+    return len(flatten_numbers(args))
+
+
+def rand_impl(*args: list[Expr]):
+    return random.random()
+
+
+def now_impl(*args: list[Expr]):
+    return time.time()
+
+
+class LibraryFunction:
+    """
+    A built-in function. Aggregates reduce whole ranges, so their calls over
+    plain ranges are memoized; everything else is cheaper to recompute than
+    to look up. Volatile functions (random numbers, the clock) have to be
+    recomputed on every recalc.
+    """
+
+    def __init__(
+        self, impl: Callable, volatile: bool = False, aggregate: bool = False
+    ) -> None:
+        self.impl = impl
+        self.volatile = volatile
+        self.aggregate = aggregate
+
+
+library = {
+    "and": LibraryFunction(and_impl),
+    "if": LibraryFunction(if_impl),
+    "not": LibraryFunction(not_impl),
+    "sum": LibraryFunction(sum_impl, aggregate=True),
+    "min": LibraryFunction(min_impl, aggregate=True),
+    "max": LibraryFunction(max_impl, aggregate=True),
+    "average": LibraryFunction(average_impl, aggregate=True),
+    "count": LibraryFunction(count_impl, aggregate=True),
+    "rand": LibraryFunction(rand_impl, volatile=True),
+    "now": LibraryFunction(now_impl, volatile=True),
+}
+
+volatile_functions = {name for name, func in library.items() if func.volatile}
 
 
 class FunctionCall(Expr):
@@ -143,15 +219,38 @@ class FunctionCall(Expr):
         self.identifier = identifier
         self.arguments = arguments
 
-    def eval(self, cell_ref_table: dict[str, Any]):
+    def eval(self, cell_ref_table: dict[str, Any], call_cache: CallCache | None = None):
         func = self.identifier.text.lower()
         if func in library:
+            function = library[func]
+            ranges = self.range_arguments()
+            # a hit never touches the range cells, that is the whole saving
+            if call_cache is not None and function.aggregate and ranges:
+                found, result = call_cache.get(func, ranges)
+                if found:
+                    return result
+
             evaluated_args = [
-                arg.eval(cell_ref_table=cell_ref_table) for arg in self.arguments
+                arg.eval(cell_ref_table=cell_ref_table, call_cache=call_cache)
+                for arg in self.arguments
             ]
-            return library[func](*evaluated_args)
+            result = function.impl(*evaluated_args)
+            if call_cache is not None and function.aggregate and ranges:
+                call_cache.put(func, ranges, result)
+            return result
         else:
             raise Exception(f"Identifier: {self.identifier} not found in library.")
 
+    def range_arguments(self) -> tuple[str, ...] | None:
+        """
+        Returns the argument ranges when every argument is a range literal.
+        """
+        ranges = []
+        for arg in self.arguments:
+            if not isinstance(arg, Literal) or arg.token.type != TokenType.CELL_RANGE:
+                return None
+            ranges.append(arg.token.text.upper())
+        return tuple(ranges) or None
+
     def __repr__(self) -> str:
         return f"FunctionCall({self.identifier}, {self.arguments})"
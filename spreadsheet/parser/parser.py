@@ -20,7 +20,7 @@ unary          -> ("-" | "+") unary | function-call ;
 *
  When we interpret, we'll need to do a lookup for built-in function calls
 *
-function-call  -> IDENTIFIER ("(" arguments ")") expression ;
+function-call  -> IDENTIFIER ("(" arguments? ")") expression ;
 
 primary        -> NUMBER | STRING | IDENTIFIER | "true" | "false" | CELL_REF | CELL_RANGE ;
 
@@ -122,7 +122,11 @@ class Parser:
         if self.match(TokenType.IDENTIFIER):
             identifier = self.previous()
             if self.match(TokenType.OPEN_PAREN):
-                arguments = self.arguments()
+                # zero-argument calls like RAND()
+                if self.current_token().type == TokenType.CLOSED_PAREN:
+                    arguments = []
+                else:
+                    arguments = self.arguments()
                 if self.match(TokenType.CLOSED_PAREN):
                     return FunctionCall(identifier=identifier, arguments=arguments)
                 else:
@@ -0,0 +1,204 @@
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any
+
+from spreadsheet.engine import Cell, CellError, Sheet
+from spreadsheet.parser.parser import Scanner, Parser
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# below this many scenarios, shipping rows to worker processes costs more
+# than evaluating them in place
+POOL_THRESHOLD = 2000
+
+
+def scenario_subgraph(
+    sheet: Sheet, input_cells: list[Cell], output_cells: list[Cell]
+) -> list[Cell]:
+    """
+    Returns the cells that sit between the inputs and the outputs, in the
+    order they have to be evaluated. Cells outside this subgraph cannot
+    change between scenarios.
+    """
+    dag = sheet.dependency_graph
+    between = dag.descendants(*input_cells) & dag.ancestors(*output_cells)
+    return [cell for cell in dag.topological_sort(between) if cell not in input_cells]
+
+
+def evaluate_scenarios(
+    sheet: Sheet,
+    inputs: list[str],
+    scenarios: list[list[Any]],
+    outputs: list[str],
+    processes: int | None = None,
+) -> dict[str, list[Any]]:
+    """
+    Evaluates every output cell once per scenario, where each scenario is a
+    vector of values for the input cells, without touching the sheet.
+
+    Example:
+        results = evaluate_scenarios(sheet, ["A1"], [[1], [2], [3]], ["B1"])
+
+        results == {"B1": [3, 6, 9]}  # B1 = A1 * 3
+    """
+    size = len(scenarios)
+    workers = processes or os.cpu_count() or 1
+
+    # everything the evaluation reads is captured under the sheet lock, so
+    # background recalcs and concurrent edits can carry on while it runs
+    with sheet._lock:
+        input_cells = [sheet.get_cell(ref) for ref in inputs]
+        output_cells = [sheet.get_cell(ref) for ref in outputs]
+        subgraph = scenario_subgraph(sheet, input_cells, output_cells)
+        varying_cells = {*input_cells, *subgraph}
+
+        steps = []
+        for cell in subgraph:
+            varying_refs, constants = {}, {}
+            for ref in cell.dependencies:
+                dependency = sheet.get_cell(ref)
+                if dependency in varying_cells:
+                    varying_refs[ref] = dependency.cell_ref
+                else:
+                    constants[ref] = get_constant(dependency)
+            parse_tree = cell.get_parse_tree()
+            steps.append(
+                (
+                    cell.cell_ref,
+                    cell.formula,
+                    parse_tree,
+                    varying_refs,
+                    constants,
+                    cell.is_volatile(),
+                )
+            )
+        output_constants = {
+            cell.cell_ref: get_constant(cell)
+            for cell in output_cells
+            if cell not in varying_cells
+        }
+
+    columns = {
+        cell.cell_ref: [scenario[i] for scenario in scenarios]
+        for i, cell in enumerate(input_cells)
+    }
+    pool = None
+
+    try:
+        for cell_ref, formula, parse_tree, varying_refs, constants, volatile in steps:
+            varying = {ref: columns[dep] for ref, dep in varying_refs.items()}
+            # a vectorized RAND() would be one draw broadcast to every scenario
+            column = None
+            if not volatile:
+                column = eval_vectorized(parse_tree, varying, constants, size)
+            if column is None:
+                rows = [
+                    {**constants, **{ref: vals[i] for ref, vals in varying.items()}}
+                    for i in range(size)
+                ]
+                # forked workers share the parent's random state, so their
+                # chunks would repeat the same draws
+                use_pool = size >= POOL_THRESHOLD and workers > 1 and not volatile
+                if use_pool and pool is None:
+                    pool = ProcessPoolExecutor(max_workers=workers)
+                row_pool = pool if use_pool else None
+                column = eval_rows_in_pool(row_pool, formula, rows, workers)
+            columns[cell_ref] = column
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {
+        ref: columns[cell.cell_ref]
+        if cell.cell_ref in columns
+        else [output_constants[cell.cell_ref]] * size
+        for ref, cell in zip(outputs, output_cells)
+    }
+
+
+def get_constant(cell: Cell) -> Any:
+    value, is_stale = cell.get_last_value()
+    if is_stale:
+        raise Exception(
+            f"{cell.cell_ref} has not been recalculated; recalculate the sheet "
+            "before evaluating scenarios."
+        )
+    return value
+
+
+def eval_vectorized(
+    parse_tree: Any, varying: dict[str, list], constants: dict[str, Any], size: int
+) -> list[Any] | None:
+    """
+    Evaluates the formula once with numpy arrays standing in for the varying
+    references. Returns None when numpy is unavailable, the formula needs a
+    scalar somewhere (e.g. the condition of an IF) or a float operation
+    overflows or divides by zero.
+
+    Integer columns are evaluated as object arrays of Python ints, so they
+    keep Python's arbitrary precision instead of wrapping around in int64.
+    """
+    if np is None:
+        return None
+    # errors only come out right row by row
+    if any(isinstance(value, CellError) for value in constants.values()) or any(
+        isinstance(value, CellError) for values in varying.values() for value in values
+    ):
+        return None
+
+    arrays = {}
+    for ref, values in varying.items():
+        array = np.asarray(values)
+        if array.dtype.kind in "iu":
+            array = array.astype(object)
+        arrays[ref] = array
+    table = {**constants, **arrays}
+    try:
+        with np.errstate(all="raise"):
+            result = np.asarray(parse_tree.eval(cell_ref_table=table))
+        # object results from non-object inputs mean the formula built
+        # something other than a column of values
+        if result.dtype == object and all(
+            array.dtype != object for array in arrays.values()
+        ):
+            return None
+        return np.broadcast_to(result, (size,)).tolist()
+    except Exception:
+        return None
+
+
+def eval_rows(formula: str, rows: list[dict[str, Any]]) -> list[Any]:
+    parse_tree = Parser(Scanner(formula).scan_tokens()).parse()
+    return [eval_row(parse_tree, row) for row in rows]
+
+
+def eval_row(parse_tree: Any, row: dict[str, Any]) -> Any:
+    # a failing scenario gets an error value, like Cell.calculate stores
+    for value in row.values():
+        if isinstance(value, CellError):
+            return value
+    try:
+        return parse_tree.eval(cell_ref_table=row)
+    except Exception as e:
+        return CellError(str(e))
+
+
+def eval_rows_in_pool(
+    pool: ProcessPoolExecutor | None,
+    formula: str,
+    rows: list[dict[str, Any]],
+    workers: int,
+) -> list[Any]:
+    if pool is None:
+        return eval_rows(formula, rows)
+
+    chunk_size = math.ceil(len(rows) / workers)
+    chunks = [rows[i : i + chunk_size] for i in range(0, len(rows), chunk_size)]
+    column = []
+    for result in pool.map(eval_rows, [formula] * len(chunks), chunks):
+        column.extend(result)
+    return column
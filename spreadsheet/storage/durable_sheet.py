@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import threading
+from typing import Any
+
+from spreadsheet.engine import (
+    CalculationMode,
+    Cell,
+    CellError,
+    InvalidEditError,
+    RecalcPlan,
+    Sheet,
+)
+from spreadsheet.storage.edit_log import EditLog, read_records
+
+LOG_FILE = "edits.log"
+CHECKPOINT_FILE = "checkpoint.json"
+
+logger = logging.getLogger(__name__)
+
+
+def write_checkpoint(path: str, seq: int, sheet: Sheet) -> None:
+    cells = {}
+    for cell in sheet.formula_cells():
+        value, is_stale = cell.get_last_value()
+        # errors aren't JSON, they are simply recalculated on open
+        if is_stale or isinstance(value, CellError):
+            value = None
+        cells[cell.cell_ref] = [cell.formula, value]
+    checkpoint = {"seq": seq, "dimensions": list(sheet.dimensions), "cells": cells}
+
+    # write aside and rename so a crash never leaves a half-written checkpoint
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(checkpoint, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    # the rename itself is only durable once the directory is synced, and
+    # the caller truncates the log right after this returns
+    fsync_directory(os.path.dirname(path) or ".")
+
+
+def fsync_directory(directory: str) -> None:
+    fd = os.open(directory, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def read_checkpoint(path: str) -> dict[str, Any] | None:
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+class DurableSheet:
+    """
+    Wraps a Sheet so every batch of edits is written to the edit log before
+    update_cells returns, with a checkpoint of the whole sheet taken every
+    `checkpoint_interval` logged batches.
+
+    Only edits that pass Sheet.check_edits are logged. Use DurableSheet.open
+    to recover: it loads the latest checkpoint, replays only the log records
+    written after it and recalculates just the cells those records dirtied.
+    """
+
+    def __init__(
+        self,
+        sheet: Sheet,
+        directory: str,
+        next_seq: int = 1,
+        checkpoint_interval: int = 1000,
+    ) -> None:
+        self.sheet = sheet
+        self.directory = directory
+        self.checkpoint_interval = checkpoint_interval
+        self.log = EditLog(os.path.join(directory, LOG_FILE), next_seq=next_seq)
+
+        self._apply_lock = threading.Lock()
+        self._checkpoint_seq = next_seq - 1
+
+    @classmethod
+    def open(
+        cls,
+        directory: str,
+        dimensions: tuple[int, int],
+        checkpoint_interval: int = 1000,
+    ) -> "DurableSheet":
+        os.makedirs(directory, exist_ok=True)
+        checkpoint = read_checkpoint(os.path.join(directory, CHECKPOINT_FILE))
+
+        # recalculation is deferred until the whole log tail is replayed
+        if checkpoint is None:
+            sheet = Sheet(dimensions, calculation_mode=CalculationMode.MANUAL)
+            seq = 0
+        else:
+            sheet = Sheet(
+                tuple(checkpoint["dimensions"]),
+                calculation_mode=CalculationMode.MANUAL,
+            )
+            seq = checkpoint["seq"]
+            for cell_ref, (formula, value) in checkpoint["cells"].items():
+                sheet.load_cell(cell_ref, formula, value)
+
+        log_path = os.path.join(directory, LOG_FILE)
+        valid_length = 0
+        for end_offset, record_seq, edits in read_records(log_path):
+            valid_length = end_offset
+            # records at or below the checkpoint survive a crash mid-truncate
+            if record_seq <= seq:
+                continue
+            # records are replayed in order, each was checked against the
+            # sheet as it stood after the records before it
+            errors = sheet.check_edits(edits)
+            if errors:
+                # logs written before edits were validated can hold edits
+                # that never applied
+                logger.warning(
+                    "Dropping invalid edits from log record %s: %s",
+                    record_seq,
+                    errors,
+                )
+                edits = {
+                    cell_ref: formula
+                    for cell_ref, formula in edits.items()
+                    if cell_ref not in errors
+                }
+            sheet.update_cells(edits)
+            seq = record_seq
+
+        if os.path.exists(log_path):
+            os.truncate(log_path, valid_length)
+
+        durable_sheet = cls(
+            sheet, directory, next_seq=seq + 1, checkpoint_interval=checkpoint_interval
+        )
+        durable_sheet._checkpoint_seq = checkpoint["seq"] if checkpoint else 0
+        # one recalc for the whole tail, so each dirtied cell is calculated once
+        sheet.set_calculation_mode(CalculationMode.AUTOMATIC)
+        return durable_sheet
+
+    def get_cell(self, cell_ref: str) -> Cell:
+        return self.sheet.get_cell(cell_ref)
+
+    def check_edits(
+        self, edits: dict[str, str], accepted: dict[str, str] | None = None
+    ) -> dict[str, str]:
+        return self.sheet.check_edits(edits, accepted)
+
+    def explain(self, edits: dict[str, str]) -> RecalcPlan:
+        return self.sheet.explain(edits)
+
+    def update_cells(self, edits: dict[str, str]) -> list[Cell]:
+        # the log order has to match the apply order, but the fsync itself
+        # happens outside the lock so concurrent writers can share it
+        seq = None
+        try:
+            with self._apply_lock:
+                errors = self.sheet.check_edits(edits)
+                if errors:
+                    raise InvalidEditError(errors)
+                seq = self.log.append(edits)
+                recalculated = self.sheet.update_cells(edits)
+        finally:
+            # a failed recalc still leaves the new formulas in the sheet
+            if seq is not None:
+                self.log.sync(seq)
+
+        if seq - self._checkpoint_seq >= self.checkpoint_interval:
+            self.checkpoint()
+        return recalculated
+
+    def checkpoint(self) -> None:
+        with self._apply_lock:
+            seq = self.log.last_seq
+            if seq == self._checkpoint_seq:
+                return
+            write_checkpoint(
+                os.path.join(self.directory, CHECKPOINT_FILE), seq, self.sheet
+            )
+            self.log.truncate()
+            self._checkpoint_seq = seq
+
+    def close(self) -> None:
+        self.log.close()
@@ -0,0 +1,147 @@
+import os
+import struct
+import threading
+import zlib
+from typing import Iterator
+
+"""
+Binary edit log format:
+
+record         -> frame payload ;
+frame          -> payload length (uint32) crc32 of payload (uint32) ;
+payload        -> sequence number (uint64) edit count (uint32) edit* ;
+edit           -> ref length (uint16) ref formula length (uint32) formula ;
+
+All integers are little-endian. A record that is cut short or fails its
+checksum marks the torn tail of a crashed write, and everything from it
+onwards is discarded.
+"""
+
+FRAME = struct.Struct("<II")
+HEADER = struct.Struct("<QI")
+REF_LENGTH = struct.Struct("<H")
+FORMULA_LENGTH = struct.Struct("<I")
+
+
+def encode_record(seq: int, edits: dict[str, str]) -> bytes:
+    parts = [HEADER.pack(seq, len(edits))]
+    for cell_ref, formula in edits.items():
+        ref_bytes = cell_ref.encode()
+        formula_bytes = formula.encode()
+        parts.append(REF_LENGTH.pack(len(ref_bytes)) + ref_bytes)
+        parts.append(FORMULA_LENGTH.pack(len(formula_bytes)) + formula_bytes)
+    payload = b"".join(parts)
+    return FRAME.pack(len(payload), zlib.crc32(payload)) + payload
+
+
+def decode_payload(payload: bytes) -> tuple[int, dict[str, str]]:
+    seq, count = HEADER.unpack_from(payload, 0)
+    offset = HEADER.size
+    edits = {}
+    for _ in range(count):
+        (ref_length,) = REF_LENGTH.unpack_from(payload, offset)
+        offset += REF_LENGTH.size
+        cell_ref = payload[offset : offset + ref_length].decode()
+        offset += ref_length
+
+        (formula_length,) = FORMULA_LENGTH.unpack_from(payload, offset)
+        offset += FORMULA_LENGTH.size
+        formula = payload[offset : offset + formula_length].decode()
+        offset += formula_length
+
+        edits[cell_ref] = formula
+    return seq, edits
+
+
+def read_records(path: str) -> Iterator[tuple[int, int, dict[str, str]]]:
+    """
+    Yields (end offset, sequence number, edits) for every intact record,
+    stopping at the first torn or corrupt one.
+    """
+    if not os.path.exists(path):
+        return
+
+    with open(path, "rb") as f:
+        data = f.read()
+
+    offset = 0
+    while offset + FRAME.size <= len(data):
+        length, checksum = FRAME.unpack_from(data, offset)
+        start = offset + FRAME.size
+        payload = data[start : start + length]
+        if len(payload) < length or zlib.crc32(payload) != checksum:
+            return
+        offset = start + length
+        seq, edits = decode_payload(payload)
+        yield offset, seq, edits
+
+
+class EditLog:
+    """
+    Append-only log of cell writes with group commit.
+
+    append() only buffers a record; sync() makes it durable. When several
+    threads sync at once, one of them fsyncs on behalf of everything
+    written so far while the rest wait for it, so a burst of concurrent
+    edits costs a single fsync.
+    """
+
+    def __init__(self, path: str, next_seq: int = 1) -> None:
+        self.path = path
+        self.sync_count = 0
+
+        self._file = open(path, "ab")
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._syncing = False
+        self._written_seq = next_seq - 1
+        self._durable_seq = next_seq - 1
+
+    @property
+    def last_seq(self) -> int:
+        return self._written_seq
+
+    def append(self, edits: dict[str, str]) -> int:
+        with self._lock:
+            seq = self._written_seq + 1
+            self._file.write(encode_record(seq, edits))
+            self._written_seq = seq
+            return seq
+
+    def sync(self, seq: int) -> None:
+        with self._lock:
+            while self._durable_seq < seq:
+                if self._syncing:
+                    self._synced.wait()
+                    continue
+
+                self._syncing = True
+                target = self._written_seq
+                self._file.flush()
+                self._lock.release()
+                try:
+                    os.fsync(self._file.fileno())
+                finally:
+                    self._lock.acquire()
+                    self._syncing = False
+                    self._synced.notify_all()
+
+                self.sync_count += 1
+                self._durable_seq = max(self._durable_seq, target)
+
+    def truncate(self) -> None:
+        """
+        Drops every record once a checkpoint covers them.
+        """
+        with self._lock:
+            while self._syncing:
+                self._synced.wait()
+            self._file.flush()
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            self._durable_seq = self._written_seq
+            self._synced.notify_all()
+
+    def close(self) -> None:
+        self.sync(self._written_seq)
+        self._file.close()
@@ -0,0 +1,119 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from spreadsheet.engine import CellError, InvalidEditError
+from spreadsheet.storage import durable_sheet
+from spreadsheet.storage.durable_sheet import DurableSheet
+from spreadsheet.storage.edit_log import EditLog, read_records
+
+
+class TestDurableSheet(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.directory = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_recovers_from_log_without_checkpoint(self):
+        sheet = DurableSheet.open(self.directory, (3, 3))
+        sheet.update_cells({"A1": "2", "B1": "A1 * 3"})
+        sheet.update_cells({"A1": "5"})
+        # no close: simulate a crash after the edits were acknowledged
+
+        recovered = DurableSheet.open(self.directory, (3, 3))
+        self.assertEqual(recovered.get_cell("B1").get_value(), 15)
+
+    def test_replays_only_log_tail_after_checkpoint(self):
+        sheet = DurableSheet.open(self.directory, (3, 3), checkpoint_interval=2)
+        sheet.update_cells({"A1": "2", "B1": "A1 * 3", "C1": "7"})
+        sheet.update_cells({"A2": "C1 + 1"})
+        sheet.update_cells({"A1": "4"})
+        self.assertEqual(len(list(read_records(sheet.log.path))), 1)
+
+        recovered = DurableSheet.open(self.directory, (3, 3))
+        self.assertEqual(recovered.get_cell("B1").get_value(), 12)
+        self.assertEqual(recovered.get_cell("A2").get_value(), 8)
+
+    def test_ignores_torn_tail(self):
+        sheet = DurableSheet.open(self.directory, (3, 3))
+        sheet.update_cells({"A1": "2"})
+        sheet.close()
+        with open(os.path.join(self.directory, "edits.log"), "ab") as f:
+            f.write(b"\x10\x00\x00\x00garbage")
+
+        recovered = DurableSheet.open(self.directory, (3, 3))
+        self.assertEqual(recovered.get_cell("A1").get_value(), 2)
+        recovered.update_cells({"A1": "3"})
+        self.assertEqual(len(list(read_records(recovered.log.path))), 2)
+
+    def test_invalid_edits_are_not_logged(self):
+        sheet = DurableSheet.open(self.directory, (3, 3))
+        sheet.update_cells({"A1": "2"})
+        with self.assertRaises(InvalidEditError):
+            sheet.update_cells({"B1": "2 +"})
+        sheet.update_cells({"C1": "B2 > 1"})
+        self.assertEqual(len(list(read_records(sheet.log.path))), 2)
+
+        recovered = DurableSheet.open(self.directory, (3, 3))
+        self.assertEqual(recovered.get_cell("A1").get_value(), 2)
+        self.assertIsInstance(recovered.get_cell("C1").get_value(), CellError)
+
+    def test_replay_drops_invalid_logged_edits(self):
+        log = EditLog(os.path.join(self.directory, "edits.log"))
+        log.append({"A1": "2", "B1": "No literal", "C1": "C1 + 1"})
+        log.close()
+
+        with self.assertLogs("spreadsheet.storage.durable_sheet", level="WARNING"):
+            recovered = DurableSheet.open(self.directory, (3, 3))
+        self.assertEqual(recovered.get_cell("A1").get_value(), 2)
+        self.assertEqual(recovered.get_cell("B1").formula, None)
+        self.assertEqual(recovered.get_cell("C1").formula, None)
+
+    def test_replays_records_in_order(self):
+        sheet = DurableSheet.open(self.directory, (3, 3))
+        sheet.update_cells({"A1": "5"})
+        sheet.update_cells({"B1": "A1"})
+        sheet.checkpoint()
+        sheet.update_cells({"A1": "7"})
+        sheet.update_cells({"B1": "1"})
+        sheet.update_cells({"A1": "B1 + 1"})
+
+        recovered = DurableSheet.open(self.directory, (3, 3))
+        self.assertEqual(recovered.get_cell("A1").formula, "B1 + 1")
+        self.assertEqual(recovered.get_cell("A1").get_value(), 2)
+        self.assertEqual(recovered.get_cell("B1").get_value(), 1)
+
+    def test_checkpoint_syncs_directory_before_truncating_log(self):
+        sheet = DurableSheet.open(self.directory, (3, 3))
+        sheet.update_cells({"A1": "2"})
+        calls = []
+        fsync_directory = durable_sheet.fsync_directory
+        truncate = sheet.log.truncate
+        with mock.patch.object(
+            durable_sheet,
+            "fsync_directory",
+            lambda path: calls.append("fsync") or fsync_directory(path),
+        ), mock.patch.object(
+            sheet.log, "truncate", lambda: calls.append("truncate") or truncate()
+        ):
+            sheet.checkpoint()
+        self.assertEqual(calls, ["fsync", "truncate"])
+
+    def test_group_commit_shares_fsyncs(self):
+        log = EditLog(os.path.join(self.directory, "edits.log"))
+        seqs = [log.append({"A1": str(i)}) for i in range(20)]
+        threads = [threading.Thread(target=log.sync, args=(seq,)) for seq in seqs]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertLess(log.sync_count, len(seqs))
+        self.assertEqual(len(list(read_records(log.path))), 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,17 @@
+import threading
+import time
 import unittest
-from spreadsheet.engine import Row, Cell, Sheet, Column
+from unittest import mock
+from spreadsheet.engine import (
+    Row,
+    Cell,
+    Sheet,
+    Column,
+    CalculationMode,
+    CellError,
+    InvalidEditError,
+)
+from spreadsheet.parser.call_cache import CallCache
 
 
 class TestSpreadsheet(unittest.TestCase):
@@ -38,22 +50,226 @@ class TestSpreadsheet(unittest.TestCase):
     #     self.assertEqual(sheet.get_cell(1, 1).value, 9)
 
     def test_eval_formula(self):
-        # Define a simple test case with two cells
-        cell_matrix = [
-            Row([Cell('3'), Cell('5')]),   # Row 1: 3 + 5 = 8
-            Row([Cell('2'), Cell('4')]),   # Row 2: 2 * 4 = 8
-            Row([Cell('1'), Cell('3')]),    # Row 3: 1 ^ 2 = 1
-        ]
-
-        cell1 = Cell(formula="=A1+B1")
-
-        # Test the eval_formula function with the test case
-        print(cell1.eval_formula(cell_matrix))
-        # print(eval_formula('A2*B2', cell_matrix))
-        # assert eval_formula('A3^2', cell_values) == 1
-        # assert eval_formula('SUM(A1:B1)', cell_values) == 8
-        # assert eval_formula('SUM(A1:B2)', cell_values) == 20
+        sheet = Sheet((2, 3))
+        sheet.update_cells(
+            {"A1": "3", "B1": "5", "A2": "2", "B2": "4", "A3": "1", "B3": "3"}
+        )
 
+        cell = Cell(column_index=0, row_index=0, formula="A1 + B1")
+        self.assertEqual(cell.eval_formula(sheet), 8)
+        cell = Cell(column_index=0, row_index=0, formula="A2 * B2")
+        self.assertEqual(cell.eval_formula(sheet), 8)
+        cell = Cell(column_index=0, row_index=0, formula="A3 ^ 2")
+        self.assertEqual(cell.eval_formula(sheet), 1)
+        cell = Cell(column_index=0, row_index=0, formula="SUM(A1:B2)")
+        self.assertEqual(cell.eval_formula(sheet), 14)
+
+    def test_update_cells_recalculates_dependents(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells({"A1": "2", "B1": "A1 * 3", "C1": "B1 + A1"})
+        self.assertEqual(sheet.get_cell("C1").get_value(), 8)
+
+        recalculated = sheet.update_cells({"A1": "4"})
+        self.assertEqual(
+            [cell.cell_ref for cell in recalculated], ["A1", "B1", "C1"]
+        )
+        self.assertEqual(sheet.get_cell("C1").get_value(), 16)
+
+    def test_manual_mode_waits_for_recalculate(self):
+        sheet = Sheet((3, 3), calculation_mode=CalculationMode.MANUAL)
+        sheet.update_cells({"A1": "2", "B1": "A1 * 3"})
+        self.assertEqual(sheet.get_cell("B1").get_last_value(), (None, True))
+
+        sheet.recalculate()
+        self.assertEqual(sheet.get_cell("B1").get_last_value(), (6, False))
+
+        sheet.update_cell_formula("A1", "5")
+        self.assertEqual(sheet.get_cell("B1").get_last_value(), (6, True))
+
+    def test_background_mode_resolves_futures(self):
+        sheet = Sheet((3, 3), calculation_mode=CalculationMode.BACKGROUND)
+        try:
+            self.assertEqual(sheet.update_cells({"A1": "2", "B1": "A1 * 3"}), [])
+            self.assertEqual(sheet.get_future("B1").result(timeout=5), 6)
+
+            sheet.update_cell_formula("A1", "4")
+            self.assertEqual(sheet.get_future("B1").result(timeout=5), 12)
+        finally:
+            sheet.set_calculation_mode(CalculationMode.MANUAL)
+
+    def test_background_failures_resolve_futures(self):
+        sheet = Sheet((3, 3), calculation_mode=CalculationMode.BACKGROUND)
+        try:
+            sheet.update_cells({"A1": "B1 > 1"})
+            self.assertIsInstance(sheet.get_future("A1").result(timeout=5), CellError)
+
+            # a checkpoint can still restore a cycle that edits can't create
+            sheet.load_cell("A2", "B2 + 1", None)
+            sheet.load_cell("B2", "A2 + 1", None)
+            sheet.update_cell_formula("C3", "1")
+            self.assertIsInstance(sheet.get_future("A2").result(timeout=5), CellError)
+
+            sheet.update_cell_formula("B1", "2")
+            self.assertEqual(sheet.get_future("A1").result(timeout=5), True)
+        finally:
+            sheet.set_calculation_mode(CalculationMode.MANUAL)
+
+    def test_subscribers_get_only_changed_values(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells({"A1": "2", "B1": "A1 > 1", "C1": "A1 * 2"})
+        batches = []
+        sheet.subscribe(["B1:C1"], batches.append)
+
+        sheet.update_cells({"A1": "3"})
+        sheet.update_cells({"A1": "0"})
+        sheet.update_cells({"C2": "1"})
+
+        self.assertEqual(batches, [{"C1": 6}, {"B1": False, "C1": 0}])
+
+    def test_invalid_edits_are_rejected_before_applying(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells({"A1": "2", "B1": "A1 * 3"})
+
+        with self.assertRaises(InvalidEditError) as raised:
+            sheet.update_cells({"C1": "1", "A1": "B1 + 1", "A2": "2 +", "Z9": "1"})
+        self.assertEqual(set(raised.exception.errors), {"A1", "A2", "Z9"})
+        self.assertEqual(sheet.get_cell("C1").formula, None)
+        self.assertEqual(sheet.dirty_cells, set())
+
+        sheet.update_cells({"A1": "5"})
+        self.assertEqual(sheet.get_cell("B1").get_value(), 15)
+
+    def test_cycle_check_sees_the_whole_batch(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells({"A1": "2", "B1": "A1"})
+
+        # B1 stops reading A1 in the same commit, whatever the edit order
+        sheet.update_cells({"A1": "B1 + 1", "B1": "1"})
+        self.assertEqual(sheet.get_cell("A1").get_value(), 2)
+
+        with self.assertRaises(InvalidEditError) as raised:
+            sheet.update_cells({"B1": "A1", "C1": "3"})
+        self.assertEqual(set(raised.exception.errors), {"B1"})
+
+    def test_failed_evaluation_stores_error_value(self):
+        sheet = Sheet((5, 5))
+        sheet.update_cells({"A2": "100 > C5", "B2": "A2 * 2"})
+        self.assertIsInstance(sheet.get_cell("A2").get_value(), CellError)
+        self.assertEqual(
+            sheet.get_cell("B2").get_value(), sheet.get_cell("A2").get_value()
+        )
+        self.assertEqual(sheet.dirty_cells, set())
+
+        sheet.update_cells({"C5": "2"})
+        self.assertEqual(sheet.get_cell("B2").get_value(), 2)
+
+    def test_failing_subscriber_does_not_affect_others(self):
+        sheet = Sheet((3, 3), calculation_mode=CalculationMode.BACKGROUND)
+        batches = []
+        changed = threading.Event()
+
+        def fail(batch):
+            raise ValueError("subscriber bug")
+
+        def record(batch):
+            batches.append(batch)
+            changed.set()
+
+        sheet.subscribe(["A1"], fail)
+        sheet.subscribe(["A1"], record)
+        with self.assertLogs("spreadsheet.engine", level="ERROR") as logs:
+            sheet.update_cells({"A1": "1"})
+            self.assertTrue(changed.wait(timeout=5))
+            changed.clear()
+            sheet.update_cells({"A1": "2"})
+            self.assertTrue(changed.wait(timeout=5))
+            # joins the worker, so both passes have finished notifying
+            sheet.set_calculation_mode(CalculationMode.MANUAL)
+
+        self.assertEqual(batches, [{"A1": 1}, {"A1": 2}])
+        self.assertEqual(len(logs.records), 2)
+
+    def test_range_registers_every_cell_as_dependency(self):
+        cell = Cell(column_index=3, row_index=0, formula="A1:A3")
+        self.assertEqual(cell.dependencies, ["A1", "A2", "A3"])
+
+    def test_explain_plans_without_mutating(self):
+        sheet = Sheet((4, 4))
+        sheet.update_cells(
+            {"A1": "2", "B1": "A1 * 3", "B2": "A1 + 1", "C1": "IF(B1 > B2, 1, 0)"}
+        )
+        sheet.update_cells({"D1": "SUM(A1:A3)"})
+
+        plan = sheet.explain({"A1": "5"})
+        self.assertEqual(plan.dirty_cells, ["A1", "B1", "B2", "C1", "D1"])
+        self.assertEqual((plan.depth, plan.width), (3, 3))
+        self.assertEqual(plan.invalidated_ranges, {"D1": ["A1:A3"]})
+        self.assertEqual(plan.invalidated_functions, {"sum": 1})
+        self.assertFalse(plan.creates_cycle)
+        self.assertEqual(sheet.get_cell("B1").get_last_value(), (6, False))
+
+        self.assertTrue(sheet.explain({"A1": "C1"}).creates_cycle)
+
+    def test_eval_time_excludes_upstream_cells(self):
+        sheet = Sheet((3, 3), calculation_mode=CalculationMode.MANUAL)
+        sheet.update_cells({"A1": "1", "B1": "A1 * 2"})
+        parse_tree = sheet.get_cell("A1").get_parse_tree()
+        slow_tree = mock.Mock()
+        slow_tree.eval = lambda **kwargs: time.sleep(0.05) or parse_tree.eval(**kwargs)
+        sheet.get_cell("A1")._parse_tree = slow_tree
+
+        # B1 pulls the still dirty A1 in through its dependency table
+        sheet.get_cell("B1").calculate(sheet)
+        self.assertEqual(sheet.get_cell("B1").get_value(), 2)
+        self.assertGreaterEqual(sheet.get_cell("A1").eval_time, 0.05)
+        self.assertLess(sheet.get_cell("B1").eval_time, 0.05)
+
+    def test_range_aggregates_are_memoized_across_cells(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells(
+            {"A1": "2", "A2": "3", "B1": "SUM(A1:A2)", "B2": "SUM(A1:A2) * 2"}
+        )
+        self.assertEqual(sheet.get_cell("B2").get_value(), 10)
+        self.assertEqual(sheet.call_cache.hits, 1)
+
+        # editing a cell inside the range drops the entry
+        sheet.update_cells({"A2": "4"})
+        self.assertEqual(sheet.get_cell("B1").get_value(), 6)
+        self.assertEqual(sheet.get_cell("B2").get_value(), 12)
+
+    def test_only_range_aggregates_are_memoized(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells({"A1": "2", "B1": "IF(A1 > 1, 1, 0)", "B2": "SUM(A1, 3)"})
+        sheet.update_cells({"C1": "IF(A1 > 1, 1, 0)", "C2": "SUM(A1, 3)"})
+        self.assertEqual(len(sheet.call_cache), 0)
+        self.assertEqual(sheet.call_cache.hits, 0)
+
+    def test_volatile_cells_recalculate_with_every_edit(self):
+        sheet = Sheet((3, 3))
+        sheet.update_cells({"A1": "RAND()", "B1": "A1 * 0 + 1"})
+        first = sheet.get_cell("A1").get_value()
+        self.assertEqual(sheet.volatile_cells, {sheet.get_cell("A1")})
+
+        recalculated = sheet.update_cells({"C3": "1"})
+        self.assertEqual(
+            {cell.cell_ref for cell in recalculated}, {"A1", "B1", "C3"}
+        )
+        self.assertNotEqual(sheet.get_cell("A1").get_value(), first)
+
+    def test_call_cache_evicts_least_recently_used(self):
+        cache = CallCache()
+        cache.put("sum", ("A1:A2",), 1)
+        cache.put("sum", ("B1:B2",), 2)
+        cache.get("sum", ("A1:A2",))
+        cache.max_bytes = cache.size - 1
+        cache.put("sum", ("A1:A2",), 1)
+
+        self.assertEqual(cache.get("sum", ("A1:A2",)), (True, 1))
+        self.assertEqual(cache.get("sum", ("B1:B2",)), (False, None))
+
+        cache.invalidate("A2")
+        self.assertEqual(cache.get("sum", ("A1:A2",)), (False, None))
+        self.assertEqual(len(cache), 0)
 
 if __name__ == '__main__':
     unittest.main()
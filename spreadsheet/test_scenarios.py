@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+from spreadsheet import scenarios
+from spreadsheet.engine import CellError, Sheet
+from spreadsheet.scenarios import evaluate_scenarios, scenario_subgraph
+
+
+class TestScenarios(unittest.TestCase):
+    def setUp(self):
+        self.sheet = Sheet((4, 4))
+        self.sheet.update_cells(
+            {
+                "A1": "2",
+                "A2": "10",
+                "B1": "A1 * 3",
+                "B2": "A2 + 1",
+                "C1": "IF(B1 > 10, B1, 0)",
+                "D1": "C1 + B2",
+            }
+        )
+
+    def test_subgraph_only_spans_inputs_to_outputs(self):
+        subgraph = scenario_subgraph(
+            self.sheet, [self.sheet.get_cell("A1")], [self.sheet.get_cell("D1")]
+        )
+        self.assertEqual([cell.cell_ref for cell in subgraph], ["B1", "C1", "D1"])
+
+    def test_evaluates_each_scenario_without_touching_sheet(self):
+        results = evaluate_scenarios(
+            self.sheet, ["A1"], [[1], [4], [5]], ["B1", "D1", "B2"]
+        )
+        self.assertEqual(results["B1"], [3, 12, 15])
+        self.assertEqual(results["D1"], [11, 23, 26])
+        self.assertEqual(results["B2"], [11, 11, 11])
+        self.assertEqual(self.sheet.get_cell("D1").get_value(), 11)
+
+    def test_failing_scenarios_get_error_values(self):
+        self.sheet.update_cells({"B3": "10 / A3", "C3": "B3 + 1", "D3": "D4 > 1"})
+        results = evaluate_scenarios(
+            self.sheet, ["A3"], [[1], [0], [5]], ["C3", "D3"]
+        )
+        self.assertEqual(results["C3"][0], 11)
+        self.assertIsInstance(results["C3"][1], CellError)
+        self.assertEqual(results["C3"][2], 3)
+
+        self.sheet.update_cells({"D2": "D3 + A3"})
+        results = evaluate_scenarios(self.sheet, ["A3"], [[1], [2]], ["D2"])
+        self.assertTrue(all(isinstance(v, CellError) for v in results["D2"]))
+
+    def test_volatile_formulas_draw_per_scenario(self):
+        self.sheet.update_cells({"B3": "A3 * RAND()"})
+        results = evaluate_scenarios(self.sheet, ["A3"], [[1]] * 50, ["B3"])
+        self.assertEqual(len(set(results["B3"])), 50)
+
+    @unittest.skipIf(scenarios.np is None, "numpy is not installed")
+    def test_vectorized_integers_do_not_overflow(self):
+        self.sheet.update_cells({"B3": "A3 ^ 50", "C3": "A3 * A4 * A4"})
+        tree = self.sheet.get_cell("B3").get_parse_tree()
+        column = scenarios.eval_vectorized(tree, {"A3": [3, 2]}, {}, 2)
+        self.assertEqual(column, [3**50, 2**50])
+
+        tree = self.sheet.get_cell("C3").get_parse_tree()
+        column = scenarios.eval_vectorized(tree, {"A3": [1.5]}, {"A4": 1e300}, 1)
+        self.assertIsNone(column)
+
+    def test_evaluates_large_batches_in_process_pool(self):
+        values = [[i] for i in range(40)]
+        with mock.patch.object(scenarios, "POOL_THRESHOLD", 10):
+            results = evaluate_scenarios(
+                self.sheet, ["A1"], values, ["C1"], processes=2
+            )
+        expected = [i * 3 if i * 3 > 10 else 0 for i in range(40)]
+        self.assertEqual(results["C1"], expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
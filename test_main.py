@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from main import SpreadsheetService
+from spreadsheet.engine import InvalidEditError, Sheet
+
+
+class TestSpreadsheetService(unittest.TestCase):
+    def test_concurrent_edits_are_coalesced(self):
+        async def run():
+            service = SpreadsheetService(Sheet((3, 3)), coalesce_window=0.01)
+            applied = []
+            apply = service._apply
+            service._apply = lambda batches: applied.append(batches) or apply(batches)
+
+            await asyncio.gather(
+                service.edit({"A1": "2"}),
+                service.edit({"B1": "A1 * 3"}),
+            )
+            service.close()
+            return service, applied
+
+        service, applied = asyncio.run(run())
+        self.assertEqual(applied, [[{"A1": "2"}, {"B1": "A1 * 3"}]])
+        self.assertEqual(service.read(["A1", "B1"]), {"A1": 2, "B1": 6})
+
+    def test_bad_edit_only_fails_its_own_request(self):
+        async def run():
+            service = SpreadsheetService(Sheet((3, 3)), coalesce_window=0.01)
+            requests = [
+                {"op": "edit", "edits": {"A1": "2"}},
+                {"op": "edit", "edits": {"B1": "A1 * 3", "C1": "2 +"}},
+                {"op": "edit", "edits": {"A2": "A1 + 1"}},
+            ]
+            responses = await asyncio.gather(
+                *[service.handle_request(request) for request in requests],
+                return_exceptions=True,
+            )
+            service.close()
+            return service, responses
+
+        service, responses = asyncio.run(run())
+        self.assertEqual(responses[0], {"ok": True, "values": {"A1": 2, "A2": 3}})
+        self.assertIsInstance(responses[1], InvalidEditError)
+        self.assertEqual(set(responses[1].errors), {"C1"})
+        self.assertEqual(service.read(["A2", "B1"]), {"A2": 3, "B1": None})
+
+
+    def test_batch_is_validated_as_a_whole(self):
+        async def run():
+            sheet = Sheet((3, 3))
+            sheet.update_cells({"A1": "2", "B1": "A1"})
+            service = SpreadsheetService(sheet, coalesce_window=0.01)
+            responses = await asyncio.gather(
+                service.edit({"A1": "7"}),
+                service.edit({"B1": "1"}),
+                service.edit({"A1": "B1 + 1"}),
+            )
+            service.close()
+            return sheet, responses
+
+        sheet, responses = asyncio.run(run())
+        self.assertTrue(all(response["A1"] == 2 for response in responses))
+        self.assertEqual(sheet.get_cell("A1").formula, "B1 + 1")
+
+    def test_malformed_edit_is_rejected_before_batching(self):
+        async def run():
+            service = SpreadsheetService(Sheet((3, 3)), coalesce_window=0.01)
+            responses = await asyncio.gather(
+                service.handle_request({"op": "edit", "edits": ["B1"]}),
+                service.handle_request({"op": "edit", "edits": {"A1": "2"}}),
+                return_exceptions=True,
+            )
+            service.close()
+            return service, responses
+
+        service, responses = asyncio.run(run())
+        self.assertIsInstance(responses[0], Exception)
+        self.assertEqual(responses[1], {"ok": True, "values": {"A1": 2}})
+        self.assertEqual(service.read(["A1"]), {"A1": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()